@@ -0,0 +1,100 @@
+"""Compare N single POST /plants registrations against one POST /plants/bulk.
+
+Runs against a live server:
+
+    python benchmarks/bench_bulk_plants.py --base-url http://localhost:8000 --count 1000
+
+A throwaway user is signed up for each run so the timings are not skewed by
+existing plants. Results are printed as a summary and as one JSON line.
+"""
+import argparse
+import json
+import time
+import uuid
+
+import requests
+
+
+def make_plants(count, prefix):
+    return [
+        {
+            "name": f"{prefix}-{i}",
+            "type": "monstera",
+            "watering_cycle": 7,
+            "last_watered": "2025-01-01T09:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def login_new_user(session, base_url):
+    suffix = uuid.uuid4().hex[:12]
+    user_id = f"bench_{suffix}"
+    password = "bench-password"
+    resp = session.post(f"{base_url}/auth/signup", json={
+        "nickname": "bench",
+        "userId": user_id,
+        "userPw": password,
+        "email": f"{user_id}@bench.local",
+    })
+    resp.raise_for_status()
+    resp = session.post(f"{base_url}/auth/login", json={"userId": user_id, "userPw": password})
+    resp.raise_for_status()
+    token = resp.json().get("token")
+    if not token:
+        raise Exception(f"Login failed: {resp.text}")
+    session.headers["Authorization"] = f"Bearer {token}"
+
+
+def bench_single(session, base_url, plants):
+    start = time.perf_counter()
+    for plant in plants:
+        resp = session.post(f"{base_url}/plants", json=plant)
+        resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+def bench_bulk(session, base_url, plants, ndjson=False):
+    if ndjson:
+        body = "\n".join(json.dumps(plant) for plant in plants)
+        kwargs = {"data": body, "headers": {"Content-Type": "application/x-ndjson"}}
+    else:
+        kwargs = {"json": plants}
+    start = time.perf_counter()
+    resp = session.post(f"{base_url}/plants/bulk", **kwargs)
+    elapsed = time.perf_counter() - start
+    resp.raise_for_status()
+    result = resp.json()
+    if not result["success"] or len(result["created"]) != len(plants):
+        raise Exception(f"Bulk registration failed: {result['message']}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--ndjson", action="store_true", help="send the bulk body as NDJSON")
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    with requests.Session() as session:
+        login_new_user(session, base_url)
+        single_s = bench_single(session, base_url, make_plants(args.count, "single"))
+        bulk_s = bench_bulk(session, base_url, make_plants(args.count, "bulk"), ndjson=args.ndjson)
+
+    print(f"single: {args.count} requests in {single_s:.3f}s ({args.count / single_s:.1f} plants/s)")
+    print(f"bulk:   1 request  in {bulk_s:.3f}s ({args.count / bulk_s:.1f} plants/s)")
+    print(f"speedup: {single_s / bulk_s:.1f}x")
+    print(json.dumps({
+        "benchmark": "bulk_plants",
+        "count": args.count,
+        "format": "ndjson" if args.ndjson else "json",
+        "single_seconds": round(single_s, 4),
+        "bulk_seconds": round(bulk_s, 4),
+        "speedup": round(single_s / bulk_s, 2),
+    }))
+
+
+if __name__ == "__main__":
+    main()
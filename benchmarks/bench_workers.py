@@ -0,0 +1,84 @@
+"""Read-endpoint throughput scaling from 1 to N gunicorn workers.
+
+For each worker count, boots the production server (gunicorn.conf.py) on the
+offline stack from loadtest.py and drives dashboard polling only (GET /plants,
+GET /plants/{plant_id}, GET /plants/{plant_id}/led). Load comes from several
+client processes so the load generator is not the bottleneck.
+
+    python benchmarks/bench_workers.py --workers 1,2,4 --duration 20
+
+Reports throughput, p50/p95/p99 and scaling efficiency (rps_n / (n * rps_1))
+per worker count as JSON, and checks that only one worker connected to ROS.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+
+from loadtest import OfflineStack, Recorder, collect_workload, print_summary
+
+READ_MIX = {"dashboard": 1.0}
+
+
+def client_process(args):
+    base_url, users, duration, seed = args
+    recorder, elapsed = collect_workload(base_url, users, duration, READ_MIX, seed=seed)
+    return recorder.latencies, recorder.errors, elapsed
+
+
+def measure(workers, clients, users_per_client, duration):
+    with OfflineStack(workers=workers, server="gunicorn") as stack:
+        jobs = [(stack.base_url, users_per_client, duration, i * users_per_client) for i in range(clients)]
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(client_process, jobs)
+        ros_connections = stack.ros.connections
+    recorder = Recorder()
+    for latencies, errors, _ in results:
+        recorder.merge(latencies, errors)
+    report = recorder.report(max(elapsed for _, _, elapsed in results))
+    report["workers"] = workers
+    report["ros_connections"] = ros_connections
+    return report
+
+
+def main():
+    cpu_count = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(description="Planty worker scaling benchmark")
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= cpu_count) or "1",
+                        help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=max(2, cpu_count // 2), help="load generator processes")
+    parser.add_argument("--users", type=int, default=8, help="virtual users per client process")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per worker count")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    runs = []
+    for workers in [int(n) for n in args.workers.split(",")]:
+        print(f"== {workers} worker(s)", file=sys.stderr)
+        report = measure(workers, args.clients, args.users, args.duration)
+        print_summary(report)
+        runs.append(report)
+
+    base_rps = runs[0]["throughput_rps"] / runs[0]["workers"]
+    for report in runs:
+        report["scaling_efficiency"] = round(report["throughput_rps"] / (report["workers"] * base_rps), 3) if base_rps else 0.0
+        print(
+            f"{report['workers']} worker(s): {report['throughput_rps']:.1f} req/s, "
+            f"efficiency {report['scaling_efficiency']:.2f}, ROS connections {report['ros_connections']}",
+            file=sys.stderr,
+        )
+
+    output = json.dumps({
+        "benchmark": "workers",
+        "config": {"clients": args.clients, "users_per_client": args.users, "duration": args.duration},
+        "runs": runs,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
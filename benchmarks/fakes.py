@@ -0,0 +1,272 @@
+"""Offline stand-ins for the services the server talks to.
+
+- FakeRosbridge: a minimal rosbridge websocket server that accepts roslibpy
+  clients and counts their connections and published messages.
+- FakeMjpegCamera: an MJPEG stream like /image_raw, serving one synthetic frame.
+- FakeVision: an OpenAI-compatible /v1/chat/completions endpoint with
+  configurable latency.
+
+Each fake runs in daemon threads on 127.0.0.1; call start() then stop().
+"""
+import base64
+import hashlib
+import io
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _ServerThread:
+    def __init__(self, server):
+        self.server = server
+        self.port = server.server_address[1]
+        self.thread = threading.Thread(target=server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# rosbridge
+# ---------------------------------------------------------------------------
+
+class _RosbridgeHandler(socketserver.BaseRequestHandler):
+    def recv_exact(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("client closed")
+            data += chunk
+        return data
+
+    def send_frame(self, opcode, payload=b""):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack("!H", length)
+        else:
+            header += bytes([127]) + struct.pack("!Q", length)
+        self.request.sendall(header + payload)
+
+    def handshake(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                raise ConnectionError("client closed during handshake")
+            request += chunk
+        key = None
+        for line in request.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            raise ConnectionError("missing Sec-WebSocket-Key")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.request.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+
+    def read_message(self):
+        """Return (opcode, payload) for the next complete message."""
+        message = b""
+        message_opcode = None
+        while True:
+            b1, b2 = self.recv_exact(2)
+            fin = b1 & 0x80
+            opcode = b1 & 0x0F
+            length = b2 & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self.recv_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.recv_exact(8))[0]
+            mask = self.recv_exact(4) if b2 & 0x80 else None
+            payload = self.recv_exact(length)
+            if mask:
+                payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+            if opcode >= 0x8:  # control frames are never fragmented
+                return opcode, payload
+            if message_opcode is None:
+                message_opcode = opcode
+            message += payload
+            if fin:
+                return message_opcode, message
+
+    def handle(self):
+        try:
+            self.handshake()
+            self.server.fake.record({"op": "connect"})
+            while True:
+                opcode, payload = self.read_message()
+                if opcode == 0x8:  # close
+                    self.send_frame(0x8, payload[:2])
+                    return
+                if opcode == 0x9:  # ping
+                    self.send_frame(0xA, payload)
+                    continue
+                if opcode == 0x1:
+                    self.server.fake.record(json.loads(payload))
+        except (ConnectionError, OSError, ValueError):
+            return
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeRosbridge(_ServerThread):
+    def __init__(self, port=0):
+        server = _ThreadingTCPServer(("127.0.0.1", port), _RosbridgeHandler)
+        server.fake = self
+        super().__init__(server)
+        self.lock = threading.Lock()
+        self.ops = {}
+
+    def record(self, message):
+        with self.lock:
+            op = message.get("op", "unknown")
+            self.ops[op] = self.ops.get(op, 0) + 1
+
+    @property
+    def published(self):
+        with self.lock:
+            return self.ops.get("publish", 0)
+
+    @property
+    def connections(self):
+        with self.lock:
+            return self.ops.get("connect", 0)
+
+
+# ---------------------------------------------------------------------------
+# MJPEG camera
+# ---------------------------------------------------------------------------
+
+def make_jpeg(width=640, height=480, color=(60, 140, 60)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        fake = self.server.fake
+        if self.path.split("?")[0] != fake.path:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        with fake.lock:
+            fake.streams += 1
+        try:
+            while True:
+                self.wfile.write(
+                    b"--frame\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(fake.frame)}\r\n\r\n".encode()
+                    + fake.frame + b"\r\n"
+                )
+                self.wfile.flush()
+                time.sleep(1.0 / fake.fps)
+        except (ConnectionError, OSError):
+            return
+
+
+class FakeMjpegCamera(_ServerThread):
+    def __init__(self, port=0, fps=15.0, width=640, height=480, path="/image_raw"):
+        server = ThreadingHTTPServer(("127.0.0.1", port), _MjpegHandler)
+        server.daemon_threads = True
+        server.fake = self
+        super().__init__(server)
+        self.fps = fps
+        self.path = path
+        self.frame = make_jpeg(width, height)
+        self.lock = threading.Lock()
+        self.streams = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}{self.path}"
+
+
+# ---------------------------------------------------------------------------
+# OpenAI vision
+# ---------------------------------------------------------------------------
+
+class _VisionHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake = self.server.fake
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        time.sleep(max(0.0, fake.latency + random.uniform(-fake.jitter, fake.jitter)))
+        with fake.lock:
+            fake.calls += 1
+        body = json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": fake.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeVision(_ServerThread):
+    def __init__(self, port=0, latency=1.0, jitter=0.0, reply="식물 상태가 양호합니다. (benchmark)"):
+        server = ThreadingHTTPServer(("127.0.0.1", port), _VisionHandler)
+        server.daemon_threads = True
+        server.fake = self
+        super().__init__(server)
+        self.latency = latency
+        self.jitter = jitter
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
@@ -0,0 +1,356 @@
+"""End-to-end load test with offline stand-ins for MySQL, ROS, camera and OpenAI.
+
+Boots the app with uvicorn against SQLite, a fake rosbridge, a fake MJPEG
+camera and a mock vision endpoint (see fakes.py), then drives a mixed
+workload from virtual users:
+
+- login:     POST /auth/login
+- dashboard: GET /plants, GET /plants/{plant_id}, GET /plants/{plant_id}/led
+- led:       a burst of POST /plants/{plant_id}/led, like dragging the slider
+- analysis:  GET /plants/{plant_id}/ai-analysis
+
+    python benchmarks/loadtest.py --users 20 --duration 30 --output bench_output.txt
+
+Throughput and p50/p95/p99 per route are written as JSON (stdout by default);
+a readable summary goes to stderr. Pass --base-url to load an already running
+server instead of booting one.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+from fakes import FakeMjpegCamera, FakeRosbridge, FakeVision, free_port
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "dashboard=70,led=20,analysis=5,login=5"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, seconds, ok):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def merge(self, latencies, errors):
+        with self.lock:
+            for route, values in latencies.items():
+                self.latencies.setdefault(route, []).extend(values)
+            for route, count in errors.items():
+                self.errors[route] = self.errors.get(route, 0) + count
+
+    def report(self, elapsed):
+        routes = {}
+        total = 0
+        with self.lock:
+            for route, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                total += len(values)
+                routes[route] = {
+                    "count": len(values),
+                    "errors": self.errors.get(route, 0),
+                    "throughput_rps": round(len(values) / elapsed, 2),
+                    "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                    "p50_ms": round(percentile(values, 50) * 1000, 2),
+                    "p95_ms": round(percentile(values, 95) * 1000, 2),
+                    "p99_ms": round(percentile(values, 99) * 1000, 2),
+                    "max_ms": round(values[-1] * 1000, 2),
+                }
+        return {
+            "duration_seconds": round(elapsed, 3),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "routes": routes,
+        }
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, rng, led_burst):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.led_burst = led_burst
+        self.session = requests.Session()
+        self.user_id = f"load_{uuid.uuid4().hex[:12]}"
+        self.password = "load-password"
+        self.plant_id = None
+
+    def call(self, method, route, path, record=True, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            resp, ok = None, False
+        if record:
+            self.recorder.record(f"{method} {route}", time.perf_counter() - start, ok)
+        return resp
+
+    def setup(self):
+        self.call("POST", "/auth/signup", "/auth/signup", record=False, json={
+            "nickname": "load",
+            "userId": self.user_id,
+            "userPw": self.password,
+            "email": f"{self.user_id}@bench.local",
+        })
+        self.login(record=False)
+        resp = self.call("POST", "/plants", "/plants", record=False, json={
+            "name": "bench plant", "type": "monstera", "watering_cycle": 7,
+        })
+        self.plant_id = resp.json()["plant"]["id"]
+        self.set_led(128, record=False)
+
+    def login(self, record=True):
+        resp = self.call("POST", "/auth/login", "/auth/login", record=record,
+                         json={"userId": self.user_id, "userPw": self.password})
+        token = resp.json()["token"] if resp is not None and resp.ok else None
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def set_led(self, strength, record=True):
+        self.call("POST", "/plants/{plant_id}/led", f"/plants/{self.plant_id}/led", record=record, json={
+            "plant_id": self.plant_id, "mode": "manual",
+            "r": 255, "g": 120, "b": 200, "strength": strength,
+        })
+
+    def dashboard(self):
+        self.call("GET", "/plants", "/plants")
+        self.call("GET", "/plants/{plant_id}", f"/plants/{self.plant_id}")
+        self.call("GET", "/plants/{plant_id}/led", f"/plants/{self.plant_id}/led")
+
+    def led(self):
+        for _ in range(self.led_burst):
+            self.set_led(self.rng.randint(0, 255))
+            time.sleep(0.02)
+
+    def analysis(self):
+        self.call("GET", "/plants/{plant_id}/ai-analysis", f"/plants/{self.plant_id}/ai-analysis")
+
+
+def run_user(user, mix, barrier, deadline_holder):
+    try:
+        user.setup()
+    except Exception as e:
+        print(f"user {user.user_id} setup failed: {e}", file=sys.stderr)
+        user = None
+    barrier.wait()
+    if user is None:
+        return
+    scenarios, weights = zip(*mix.items())
+    while time.perf_counter() < deadline_holder["deadline"]:
+        getattr(user, user.rng.choices(scenarios, weights)[0])()
+
+
+def run_workload(base_url, users, duration, mix, led_burst=5, seed=0):
+    recorder, elapsed = collect_workload(base_url, users, duration, mix, led_burst, seed)
+    return recorder.report(elapsed)
+
+
+def collect_workload(base_url, users, duration, mix, led_burst=5, seed=0):
+    """Run the workload and return (Recorder, elapsed seconds) for merging."""
+    recorder = Recorder()
+    barrier = threading.Barrier(users + 1)
+    deadline_holder = {"deadline": float("inf")}
+    threads = [
+        threading.Thread(
+            target=run_user,
+            args=(VirtualUser(base_url, recorder, random.Random(seed + i), led_burst), mix, barrier, deadline_holder),
+            daemon=True,
+        )
+        for i in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    deadline_holder["deadline"] = start + duration
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("login", "dashboard", "led", "analysis"):
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/docs", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise Exception("server did not become ready")
+
+
+class OfflineStack:
+    """Fakes plus a server wired to them through environment variables.
+
+    server is "uvicorn" or "gunicorn" (the production gunicorn.conf.py).
+    """
+
+    def __init__(self, vision_latency=1.0, vision_jitter=0.0, camera_fps=15.0, workers=1, port=None, extra_env=None,
+                 server="uvicorn"):
+        self.vision_latency = vision_latency
+        self.vision_jitter = vision_jitter
+        self.camera_fps = camera_fps
+        self.workers = workers
+        self.server = server
+        self.port = port or free_port()
+        self.extra_env = extra_env or {}
+        self.process = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ros = FakeRosbridge().start()
+        self.camera = FakeMjpegCamera(fps=self.camera_fps).start()
+        self.vision = FakeVision(latency=self.vision_latency, jitter=self.vision_jitter).start()
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.tmpdir.name, 'planty.db')}",
+            "ROS_HOST": "127.0.0.1",
+            "ROS_PORT": str(self.ros.port),
+            "CAMERA_STREAM_URL": self.camera.url,
+            "OPENAI_BASE_URL": self.vision.base_url,
+            "OPENAI_API_KEY": "sk-bench",
+            "SECRET_KEY": "bench-secret",
+            "COORDINATION_DIR": os.path.join(self.tmpdir.name, "coordination"),
+            "WEB_CONCURRENCY": str(self.workers),
+            "GUNICORN_BIND": f"127.0.0.1:{self.port}",
+        })
+        env.update(self.extra_env)
+        # Create the schema up front so workers don't race on create_all
+        subprocess.run(
+            [sys.executable, "-c", "import database, models; models.Base.metadata.create_all(bind=database.engine)"],
+            cwd=REPO_ROOT, env=env, check=True,
+        )
+        if self.server == "gunicorn":
+            command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"]
+        else:
+            command = [sys.executable, "-m", "uvicorn", "main:app",
+                       "--host", "127.0.0.1", "--port", str(self.port),
+                       "--workers", str(self.workers), "--log-level", "warning"]
+        self.process = subprocess.Popen(
+            command,
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(self.base_url, self.process)
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.vision.stop()
+        self.camera.stop()
+        self.ros.stop()
+        self.tmpdir.cleanup()
+
+
+def print_summary(report, stream=sys.stderr):
+    print(f"{'route':<40} {'count':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}", file=stream)
+    for route, stats in report["routes"].items():
+        print(
+            f"{route:<40} {stats['count']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms",
+            file=stream,
+        )
+    print(f"total: {report['total_requests']} requests, {report['throughput_rps']:.1f} req/s", file=stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planty end-to-end load test")
+    parser.add_argument("--base-url", help="load an already running server instead of booting one")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--led-burst", type=int, default=5, help="LED updates per slider burst")
+    parser.add_argument("--vision-latency", type=float, default=1.0, help="mock OpenAI latency in seconds")
+    parser.add_argument("--vision-jitter", type=float, default=0.2)
+    parser.add_argument("--camera-fps", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    config = {
+        "users": args.users,
+        "duration": args.duration,
+        "mix": args.mix,
+        "led_burst": args.led_burst,
+        "vision_latency": args.vision_latency,
+        "camera_fps": args.camera_fps,
+        "workers": args.workers,
+        "server": args.server,
+    }
+    if args.base_url:
+        report = run_workload(args.base_url.rstrip("/"), args.users, args.duration, args.mix, args.led_burst, args.seed)
+    else:
+        with OfflineStack(args.vision_latency, args.vision_jitter, args.camera_fps, args.workers,
+                          server=args.server) as stack:
+            report = run_workload(stack.base_url, args.users, args.duration, args.mix, args.led_burst, args.seed)
+            report["ros_connections"] = stack.ros.connections
+            report["ros_publishes"] = stack.ros.published
+            report["vision_calls"] = stack.vision.calls
+    report = {"benchmark": "loadtest", "config": config, **report}
+
+    print_summary(report)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import threading
+import time
+import os
+import socket
+import ipaddress
+from urllib.parse import urlparse
+from contextlib import contextmanager
+import requests
+import numpy as np
+import cv2
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+CAMERA_MAX_FPS = float(os.getenv("CAMERA_MAX_FPS", "2"))  # frames decoded per second per camera
+CAMERA_MAX_CONCURRENT = int(os.getenv("CAMERA_MAX_CONCURRENT", "4"))  # leases per camera
+CAMERA_IDLE_TIMEOUT = float(os.getenv("CAMERA_IDLE_TIMEOUT", "30"))  # seconds without leases before the reader stops
+CAMERA_FRAME_MAX_AGE = float(os.getenv("CAMERA_FRAME_MAX_AGE", "10"))  # seconds a decoded frame stays servable
+CAMERA_READ_TIMEOUT = 20
+# Upper bounds for registered cameras: beyond these decimation stops mattering
+# and every lease needs its own coordination slot
+CAMERA_MAX_FPS_LIMIT = float(os.getenv("CAMERA_MAX_FPS_LIMIT", "30"))
+CAMERA_MAX_CONCURRENT_LIMIT = int(os.getenv("CAMERA_MAX_CONCURRENT_LIMIT", "32"))
+
+# Stream for plants without a registered camera (operator-configured, trusted)
+CAMERA_STREAM_URL = os.getenv("CAMERA_STREAM_URL", "https://planty.gaeun.xyz/image_raw")
+# Comma-separated hosts that registered cameras may use even if they resolve
+# to private addresses (e.g. cameras on the wireguard network)
+CAMERA_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("CAMERA_ALLOWED_HOSTS", "").split(",") if host.strip()}
+
+# Multi-worker mode: followers ask the owner worker for a camera on this
+# channel and read its latest frame from the coordination backend's store.
+CAMERA_DEMAND_CHANNEL = "camera.demand"
+
+def frame_store_key(key):
+    return f"camera.frame.{key}"
+
+def camera_slots_name(key):
+    return f"camera.slots.{key}"
+
+class CameraBusyError(Exception):
+    pass
+
+class FrameUnavailableError(Exception):
+    pass
+
+class CameraURLError(Exception):
+    pass
+
+def validate_camera_url(url):
+    """Reject camera URLs that would make the server connect to internal hosts.
+
+    Only http(s) URLs resolving to public addresses are accepted, apart from
+    CAMERA_STREAM_URL and hosts listed in CAMERA_ALLOWED_HOSTS.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise CameraURLError("Camera URL must be an http or https URL")
+    if url == CAMERA_STREAM_URL or parsed.hostname.lower() in CAMERA_ALLOWED_HOSTS:
+        return
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)
+    except (ValueError, socket.gaierror):
+        raise CameraURLError("Camera URL host could not be resolved")
+    for address in addresses:
+        if not ipaddress.ip_address(address[4][0].split("%")[0]).is_global:
+            raise CameraURLError("Camera URL must point to a public address")
+
+class LeasedStream:
+    def __init__(self, key, url, max_fps, max_concurrent):
+        self.key = key
+        self.url = url
+        self.max_fps = max_fps
+        self.max_concurrent = max_concurrent
+        self.condition = threading.Condition()
+        self.active = 0
+        self.last_used = time.monotonic()
+        self.stopped = threading.Event()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        with self.condition:
+            self.stopped.set()
+            self.condition.notify_all()
+
+    def enter(self):
+        """Take a lease. Returns False if the reader has already stopped."""
+        with self.condition:
+            if self.stopped.is_set():
+                return False
+            if self.active >= self.max_concurrent:
+                raise CameraBusyError(f"Camera {self.key} is busy ({self.max_concurrent} requests in progress)")
+            self.active += 1
+            self.last_used = time.monotonic()
+            return True
+
+    def exit(self):
+        with self.condition:
+            self.active -= 1
+            self.last_used = time.monotonic()
+
+class CameraStream(LeasedStream):
+    """One MJPEG reader shared by every request for the same camera.
+
+    The reader thread splits every JPEG out of the stream but only decodes
+    one frame per 1 / max_fps seconds; the rest are dropped undecoded. It stops
+    itself once no lease has been held for idle_timeout seconds.
+    """
+
+    def __init__(self, key, url, max_fps, max_concurrent, idle_timeout, on_frame=None):
+        super().__init__(key, url, max_fps, max_concurrent)
+        self.idle_timeout = idle_timeout
+        self.on_frame = on_frame  # called with (key, jpg) for every decoded frame
+        self.frame = None  # latest decodable JPEG bytes
+        self.frame_time = 0.0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"camera-{key}")
+
+    def start(self):
+        self.thread.start()
+        print(f'Camera stream {self.key} started: {self.url}')
+
+    def latest_jpeg(self, timeout=CAMERA_READ_TIMEOUT):
+        def fresh():
+            return self.frame is not None and time.monotonic() - self.frame_time <= CAMERA_FRAME_MAX_AGE
+
+        with self.condition:
+            # Fail fast while the reader is failing (e.g. connection refused)
+            # rather than waiting out the timeout; error clears on the next frame
+            ready = self.condition.wait_for(
+                lambda: fresh() or self.error is not None or self.stopped.is_set(), timeout=timeout
+            )
+            if not ready or not fresh():
+                reason = f": {self.error}" if self.error else ""
+                raise FrameUnavailableError(f"No frame from camera {self.key}{reason}")
+            return self.frame
+
+    def _stop_if_idle(self):
+        with self.condition:
+            if self.active == 0 and time.monotonic() - self.last_used > self.idle_timeout:
+                self.stopped.set()
+                self.condition.notify_all()
+            return self.stopped.is_set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                self._read_stream()
+            except Exception as e:
+                print(f"Camera stream {self.key} error: {str(e)}")
+                with self.condition:
+                    self.error = str(e)
+                    self.condition.notify_all()
+                if self._stop_if_idle():
+                    break
+                self.stopped.wait(1.0)  # back off before reconnecting
+        print(f'Camera stream {self.key} stopped')
+
+    def _read_stream(self):
+        # Re-checked on every connect in case DNS now points somewhere internal;
+        # redirects are not followed for the same reason
+        validate_camera_url(self.url)
+        with requests.get(self.url, stream=True, timeout=CAMERA_READ_TIMEOUT, allow_redirects=False) as r:
+            r.raise_for_status()
+            if r.status_code != 200:  # redirects, 204 and the like carry no stream
+                raise Exception(f"Unexpected HTTP status {r.status_code}")
+            buffer = bytearray()
+            for chunk in r.iter_content(chunk_size=16384):
+                if self._stop_if_idle():
+                    return
+                buffer += chunk
+                while True:
+                    a = buffer.find(JPEG_START)
+                    if a == -1:
+                        del buffer[:-1]  # keep a trailing \xff that may start the next marker
+                        break
+                    b = buffer.find(JPEG_END, a + 2)
+                    if b == -1:
+                        del buffer[:a]
+                        break
+                    jpg = bytes(buffer[a:b+2])
+                    del buffer[:b+2]
+                    self._offer(jpg)
+        # Reaching here means the server ended the stream; reconnect through
+        # the error path so it is backed off and the idle check still runs
+        raise Exception("Stream ended")
+
+    def _offer(self, jpg):
+        now = time.monotonic()
+        if self.max_fps > 0 and now - self.frame_time < 1.0 / self.max_fps:
+            return  # decimated: not decoded
+        frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return
+        with self.condition:
+            self.frame = jpg
+            self.frame_time = now
+            self.error = None
+            self.condition.notify_all()
+        if self.on_frame is not None:
+            try:
+                self.on_frame(self.key, jpg)
+            except Exception as e:
+                print(f"Camera stream {self.key} frame sink error: {str(e)}")
+
+class RemoteCameraStream(LeasedStream):
+    """A camera read by the owner worker, seen from a follower worker."""
+
+    def __init__(self, key, url, max_fps, max_concurrent, backend):
+        super().__init__(key, url, max_fps, max_concurrent)
+        self.backend = backend
+
+    def latest_jpeg(self, timeout=CAMERA_READ_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        next_demand = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_demand:
+                # Keeps the owner's reader alive; re-sent while waiting
+                self.backend.publish(CAMERA_DEMAND_CHANNEL, {
+                    "key": self.key,
+                    "url": self.url,
+                    "max_fps": self.max_fps,
+                    "max_concurrent": self.max_concurrent,
+                })
+                next_demand = now + 1.0
+            jpg = self.backend.get(frame_store_key(self.key))
+            if jpg:
+                return jpg
+            if now >= deadline:
+                raise FrameUnavailableError(f"No frame from camera {self.key} (owner worker)")
+            time.sleep(0.05)
+
+class StreamManager:
+    """Owns one CameraStream per camera, started on first use.
+
+    With a coordination backend, only the owner worker (serve_remote) reads
+    cameras; followers (use_remote) get RemoteCameraStreams instead.
+    """
+
+    def __init__(self, idle_timeout=CAMERA_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.remote = None  # backend to read frames from when this worker is a follower
+        self.frame_sink = None
+        self.slots = None  # backend holding the cross-worker max_concurrent slots
+
+    def _enter(self, key, url, max_fps, max_concurrent):
+        with self.lock:
+            for stale in [k for k, s in self.streams.items() if s.stopped.is_set()]:
+                del self.streams[stale]
+            stream = self.streams.get(key)
+            if stream is not None and stream.url != url:
+                stream.stop()
+                stream = None
+            if stream is not None:
+                stream.max_fps = max_fps
+                stream.max_concurrent = max_concurrent
+                if stream.enter():
+                    return stream
+            if self.remote is not None:
+                stream = RemoteCameraStream(key, url, max_fps, max_concurrent, self.remote)
+            else:
+                stream = CameraStream(key, url, max_fps, max_concurrent, self.idle_timeout, self.frame_sink)
+            stream.enter()
+            stream.start()
+            self.streams[key] = stream
+            return stream
+
+    @contextmanager
+    def lease(self, key, url, max_fps=CAMERA_MAX_FPS, max_concurrent=CAMERA_MAX_CONCURRENT):
+        """Hold one of the camera's concurrency slots; yields its CameraStream.
+
+        Raises CameraBusyError when max_concurrent leases are already held, by
+        any worker once a coordination backend is set.
+        """
+        slots = self.slots
+        token = None
+        if slots is not None:
+            # max_concurrent is per camera across all workers, not per worker
+            token = slots.acquire_slot(camera_slots_name(key), max_concurrent)
+            if token is None:
+                raise CameraBusyError(f"Camera {key} is busy ({max_concurrent} requests in progress)")
+        try:
+            stream = self._enter(key, url, max_fps, max_concurrent)
+            try:
+                yield stream
+            finally:
+                stream.exit()
+        finally:
+            if token is not None:
+                slots.release_slot(token)
+
+    def touch(self, key, url, max_fps, max_concurrent):
+        """Start the camera's reader if needed and reset its idle timer."""
+        try:
+            self._enter(key, url, max_fps, max_concurrent).exit()
+        except CameraBusyError:
+            pass  # in use, so not idle either
+
+    def serve_remote(self, backend):
+        """Owner worker: read cameras for every worker and share their frames."""
+        backend.subscribe(CAMERA_DEMAND_CHANNEL, lambda m: self.touch(m["key"], m["url"], m["max_fps"], m["max_concurrent"]))
+        with self.lock:
+            self.remote = None
+            self.slots = backend
+            self.frame_sink = lambda key, jpg: backend.put(frame_store_key(key), jpg, CAMERA_FRAME_MAX_AGE)
+        self.stop_all()
+
+    def use_remote(self, backend):
+        """Follower worker: get frames from the owner worker instead of reading cameras."""
+        backend.unsubscribe(CAMERA_DEMAND_CHANNEL)
+        with self.lock:
+            self.remote = backend
+            self.slots = backend
+            self.frame_sink = None
+        self.stop_all()
+
+    def stop_all(self):
+        with self.lock:
+            for stream in self.streams.values():
+                stream.stop()
+            self.streams.clear()
+
+# Create a singleton instance
+stream_manager = StreamManager()
@@ -0,0 +1,293 @@
+import fcntl
+import json
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+
+# local: single host, any number of workers (flock + unix sockets + files)
+# redis: several hosts sharing REDIS_URL (pip install redis)
+COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "local")
+COORDINATION_DIR = os.getenv("COORDINATION_DIR", "/tmp/planty-coordination")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+LEADER_LOCK_TTL = float(os.getenv("LEADER_LOCK_TTL", "10"))  # seconds, redis only
+ELECTION_INTERVAL = float(os.getenv("ELECTION_INTERVAL", "2"))  # seconds between election attempts
+SLOT_TTL = 300  # seconds before a redis slot left by a crashed worker is reclaimed
+
+class LocalBackend:
+    """Cross-worker coordination on one host.
+
+    - lock: an exclusive flock on a file, released by the kernel if the holder dies
+    - publish/subscribe: JSON datagrams on a unix socket bound by the subscriber
+    - put/get: small values in files with an expiry header
+    - acquire_slot/release_slot: a counting semaphore of flocked slot files
+    """
+
+    def __init__(self, directory=COORDINATION_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock_files = {}
+        self.subscriptions = {}
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, f"{name}{suffix}")
+
+    def acquire_lock(self, name):
+        if name in self.lock_files:
+            return True
+        f = open(self._path(name, ".lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        self.lock_files[name] = f
+        return True
+
+    def refresh_lock(self, name):
+        return name in self.lock_files
+
+    def release_lock(self, name):
+        f = self.lock_files.pop(name, None)
+        if f is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def acquire_slot(self, name, limit):
+        """Take one of `limit` slots shared by all workers. Returns a token, or None if all are taken."""
+        start = random.randrange(limit)
+        for i in range(limit):
+            f = open(self._path(f"{name}.{(start + i) % limit}", ".slot"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                continue
+            return f
+        return None
+
+    def release_slot(self, token):
+        fcntl.flock(token, fcntl.LOCK_UN)
+        token.close()
+
+    def publish(self, channel, message):
+        """Send to the channel's subscriber. Returns False if nobody is subscribed."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            try:
+                sock.sendto(json.dumps(message).encode(), self._path(channel, ".sock"))
+            except (FileNotFoundError, ConnectionRefusedError):
+                return False
+        return True
+
+    def subscribe(self, channel, handler):
+        path = self._path(channel, ".sock")
+        if os.path.exists(path):
+            os.unlink(path)  # left behind by a previous subscriber
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+
+        def listen():
+            while True:
+                try:
+                    data = sock.recv(65536)
+                except OSError:
+                    return  # socket closed by unsubscribe
+                try:
+                    handler(json.loads(data))
+                except Exception as e:
+                    print(f"Error handling {channel} message: {str(e)}")
+
+        self.subscriptions[channel] = sock
+        threading.Thread(target=listen, daemon=True, name=f"subscribe-{channel}").start()
+
+    def unsubscribe(self, channel):
+        sock = self.subscriptions.pop(channel, None)
+        if sock is not None:
+            sock.close()
+            try:
+                os.unlink(self._path(channel, ".sock"))
+            except FileNotFoundError:
+                pass
+
+    def put(self, key, value, ttl):
+        path = self._path(key, ".value")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("!d", time.time() + ttl) + value)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key, ".value"), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < 8 or struct.unpack("!d", data[:8])[0] < time.time():
+            return None
+        return data[8:]
+
+class RedisBackend:
+    """Cross-worker coordination across hosts through Redis."""
+
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+    SLOT_SCRIPT = """
+    redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+    if redis.call('zcard', KEYS[1]) < tonumber(ARGV[2]) then
+        redis.call('zadd', KEYS[1], ARGV[3], ARGV[4])
+        redis.call('pexpire', KEYS[1], ARGV[5])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url=REDIS_URL, lock_ttl=LEADER_LOCK_TTL, prefix="planty:"):
+        try:
+            import redis
+        except ImportError:
+            raise Exception("COORDINATION_BACKEND=redis requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.lock_ttl_ms = int(lock_ttl * 1000)
+        self.prefix = prefix
+        self.token = uuid.uuid4().hex
+        self.subscriptions = {}
+
+    def acquire_lock(self, name):
+        return bool(self.client.set(self.prefix + name, self.token, nx=True, px=self.lock_ttl_ms))
+
+    def refresh_lock(self, name):
+        return bool(self.client.eval(self.RENEW_SCRIPT, 1, self.prefix + name, self.token, self.lock_ttl_ms))
+
+    def release_lock(self, name):
+        self.client.eval(self.RELEASE_SCRIPT, 1, self.prefix + name, self.token)
+
+    def acquire_slot(self, name, limit):
+        key = self.prefix + name
+        token = uuid.uuid4().hex
+        now = time.time()
+        if self.client.eval(self.SLOT_SCRIPT, 1, key, now - SLOT_TTL, limit, now, token, SLOT_TTL * 1000):
+            return (key, token)
+        return None
+
+    def release_slot(self, token):
+        self.client.zrem(*token)
+
+    def publish(self, channel, message):
+        return self.client.publish(self.prefix + channel, json.dumps(message)) > 0
+
+    def subscribe(self, channel, handler):
+        def on_message(message):
+            try:
+                handler(json.loads(message["data"]))
+            except Exception as e:
+                print(f"Error handling {channel} message: {str(e)}")
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.prefix + channel: on_message})
+        self.subscriptions[channel] = pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+    def unsubscribe(self, channel):
+        thread = self.subscriptions.pop(channel, None)
+        if thread is not None:
+            thread.stop()
+
+    def put(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+def create_backend(name=COORDINATION_BACKEND):
+    if name == "local":
+        return LocalBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise Exception(f"Unknown COORDINATION_BACKEND: {name}")
+
+class Coordinator:
+    """Elects one worker as the owner of a shared resource.
+
+    Every worker calls start(); exactly one holds the lock at a time and gets
+    on_elected. The others keep retrying so a new owner takes over when the
+    current one exits. on_demoted runs if the owner loses the lock (redis TTL
+    expiry) or stops. while_leader runs on the election thread every interval
+    while this worker is the owner, for retrying owner-only connections.
+    """
+
+    def __init__(self, backend, name="owner", interval=ELECTION_INTERVAL):
+        self.backend = backend
+        self.name = name
+        self.interval = interval
+        self.is_leader = False
+        self.on_elected = None
+        self.on_demoted = None
+        self.while_leader = None
+        self.stopped = threading.Event()
+        self.step_lock = threading.Lock()  # start/stop and the election thread both step
+        self.thread = None
+
+    def _refresh(self):
+        # An unreachable backend counts as a lost lock: the redis key will
+        # expire and another worker may already be taking over
+        try:
+            return self.backend.refresh_lock(self.name)
+        except Exception as e:
+            print(f"Lock refresh failed: {str(e)}")
+            return False
+
+    def _step(self, maintain=True):
+        with self.step_lock:
+            try:
+                if not self.is_leader:
+                    if self.backend.acquire_lock(self.name):
+                        self.is_leader = True
+                        print(f"Worker {os.getpid()} elected {self.name}")
+                        if self.on_elected:
+                            self.on_elected()
+                elif not self._refresh():
+                    self.is_leader = False
+                    print(f"Worker {os.getpid()} lost {self.name}")
+                    if self.on_demoted:
+                        self.on_demoted()
+                if maintain and self.is_leader and self.while_leader:
+                    self.while_leader()
+            except Exception as e:
+                print(f"Election error: {str(e)}")
+
+    def _run(self):
+        while True:
+            self._step()
+            if self.stopped.wait(self.interval):
+                return
+
+    def start(self, on_elected=None, on_demoted=None, while_leader=None):
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.while_leader = while_leader
+        # Elect synchronously so a single worker is owner right away, but leave
+        # while_leader (which may block, e.g. connecting to ROS) to the thread
+        self._step(maintain=False)
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"election-{self.name}")
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        with self.step_lock:
+            if self.is_leader:
+                self.is_leader = False
+                if self.on_demoted:
+                    self.on_demoted()
+                self.backend.release_lock(self.name)
@@ -13,7 +13,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 1. MJPEG 스트림에서 프레임 추출
-url = "https://planty.gaeun.xyz/image_raw"
+url = os.environ.get("CAMERA_STREAM_URL", "https://planty.gaeun.xyz/image_raw")
 print("[1] MJPEG 스트림에서 프레임 추출 시도 (requests)")
 
 r = requests.get(url, stream=True, timeout=20)
@@ -0,0 +1,25 @@
+# Production server: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# One worker per core by default; WEB_CONCURRENCY overrides
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+reload = os.getenv("GUNICORN_RELOAD", "false").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))  # ai-analysis waits on the camera and OpenAI
+graceful_timeout = 30
+accesslog = os.getenv("GUNICORN_ACCESSLOG")  # e.g. "-" for stdout
+
+def on_starting(server):
+    # main.py falls back to a hard-coded key for the dev server; never serve
+    # production tokens signed with it
+    from dotenv import load_dotenv
+    load_dotenv()
+    if not os.getenv("SECRET_KEY"):
+        raise RuntimeError("SECRET_KEY must be set when running under gunicorn")
+    # Create tables once in the master so workers don't race on create_all
+    from database import engine
+    import models
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
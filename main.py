@@ -1,27 +1,27 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, EmailStr
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, EmailStr, ValidationError
 from typing import Optional, List
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import uvicorn
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
 from database import get_db, engine
 import models
 from models import PlantAIAnalysis
-from sqlalchemy import desc
+from sqlalchemy import desc, insert, text
 from ros_publisher import rgb_publisher
-import cv2
-import numpy as np
-from PIL import Image
-import io
+from camera_manager import stream_manager, validate_camera_url, CAMERA_STREAM_URL, CAMERA_MAX_FPS_LIMIT, CAMERA_MAX_CONCURRENT_LIMIT, CameraBusyError, FrameUnavailableError, CameraURLError
+from coordination import create_backend, Coordinator
 import base64
+import json
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
-import requests
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
@@ -38,10 +38,21 @@ app.add_middleware(
 )
 
 # Security configuration
-SECRET_KEY = "your-secret-key-here"  # Change this in production
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")  # Fallback for the dev server only; gunicorn.conf.py requires SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours instead of 30 minutes
 
+# Bulk plant registration
+BULK_PLANT_MAX_ITEMS = 5000
+BULK_PLANT_INSERT_CHUNK = 500  # rows per multi-row INSERT when RETURNING is unavailable
+
+
+# Multi-worker mode: one elected worker owns the ROS connection and the camera
+# readers; the others forward LED commands and read frames through the backend.
+ROS_RGB_CHANNEL = "ros.rgb"
+coordination_backend = create_backend()
+coordinator = Coordinator(coordination_backend)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -93,6 +104,7 @@ class Plant(PlantBase):
     last_watered: datetime
     created_at: datetime
     owner_id: str
+    camera_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -102,6 +114,45 @@ class PlantResponse(BaseModel):
     message: str
     plant: Optional[Plant] = None
 
+class CameraBase(BaseModel):
+    name: str
+    stream_url: str
+    max_fps: float = 2.0
+    max_concurrent: int = 4
+
+class CameraCreate(CameraBase):
+    pass
+
+class Camera(CameraBase):
+    id: int
+    created_at: datetime
+    owner_id: str
+
+    class Config:
+        from_attributes = True
+
+class CameraResponse(BaseModel):
+    success: bool
+    message: str
+    camera: Optional[Camera] = None
+
+class PlantCameraLink(BaseModel):
+    camera_id: Optional[int] = None  # None: use the default stream
+
+class PlantBulkCreated(BaseModel):
+    index: int
+    id: int
+
+class PlantBulkError(BaseModel):
+    index: int
+    error: str
+
+class PlantBulkResponse(BaseModel):
+    success: bool
+    message: str
+    created: List[PlantBulkCreated] = []
+    failed: List[PlantBulkError] = []
+
 class PlantLedBase(BaseModel):
     plant_id: int
     mode: str
@@ -131,6 +182,120 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def parse_last_watered(value: Optional[str]) -> datetime:
+    if value:
+        try:
+            return datetime.fromisoformat(value)
+        except Exception:
+            pass
+    return datetime.utcnow()
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc']) or 'item'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+async def read_bulk_items(request: Request):
+    """Read a bulk body as a JSON array or an NDJSON stream.
+
+    Returns the decoded items and the per-line decode errors; undecodable
+    NDJSON lines keep their index with a None placeholder. A malformed JSON
+    array body is rejected as a whole.
+    """
+    content_type = request.headers.get("content-type", "")
+    items = []
+    errors = []
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        def decode_line(line: bytes):
+            line = line.strip()
+            if not line:
+                return
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                errors.append(PlantBulkError(index=len(items), error=f"Invalid JSON: {str(e)}"))
+                items.append(None)
+
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                decode_line(line)
+            if len(items) > BULK_PLANT_MAX_ITEMS:
+                break
+        decode_line(pending)
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array of plants")
+
+    if len(items) > BULK_PLANT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_PLANT_MAX_ITEMS} plants per request")
+    return items, errors
+
+def insert_plants_bulk(db: Session, rows: List[dict]) -> List[int]:
+    """Insert plant rows in the current transaction and return their ids in input order."""
+    if not rows:
+        return []
+    dialect = db.get_bind().dialect
+    if getattr(dialect, "insert_executemany_returning_sort_by_parameter_order", False):
+        # SQLite / PostgreSQL / MariaDB: batched executemany with ordered RETURNING
+        result = db.execute(
+            insert(models.Plant).returning(models.Plant.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+
+    if dialect.name in ("mysql", "mariadb"):
+        # MySQL: multi-row INSERT ... VALUES. A multi-row insert is a "simple insert",
+        # so InnoDB allocates its ids in one go: lastrowid is the first of them and
+        # the rest follow at auto_increment_increment steps.
+        step = db.execute(text("SELECT @@auto_increment_increment")).scalar()
+        ids = []
+        for start in range(0, len(rows), BULK_PLANT_INSERT_CHUNK):
+            chunk = rows[start:start + BULK_PLANT_INSERT_CHUNK]
+            result = db.execute(insert(models.Plant).values(chunk))
+            first_id = result.lastrowid
+            ids.extend(range(first_id, first_id + len(chunk) * step, step))
+        return ids
+
+    # Anything else: one INSERT per row, slower but the ids are always right
+    return [db.execute(insert(models.Plant).values(row)).inserted_primary_key[0] for row in rows]
+
+def publish_rgb(r, g, b):
+    if coordinator.is_leader:
+        rgb_publisher.publish_rgb(r, g, b)
+    elif not coordination_backend.publish(ROS_RGB_CHANNEL, {"r": r, "g": g, "b": b}):
+        raise Exception("No worker owns the ROS connection")
+
+def become_owner():
+    # The ROS connection itself is opened (and retried) by
+    # rgb_publisher.ensure_started on the election thread
+    coordination_backend.subscribe(ROS_RGB_CHANNEL, lambda m: rgb_publisher.publish_rgb(m["r"], m["g"], m["b"]))
+    stream_manager.serve_remote(coordination_backend)
+
+def become_follower():
+    coordination_backend.unsubscribe(ROS_RGB_CHANNEL)
+    stream_manager.use_remote(coordination_backend)
+    rgb_publisher.stop()
+
+@app.on_event("startup")
+def start_coordination():
+    # Every worker starts as a follower; the election winner switches to owner
+    stream_manager.use_remote(coordination_backend)
+    coordinator.start(on_elected=become_owner, on_demoted=become_follower, while_leader=rgb_publisher.ensure_started)
+
+@app.on_event("shutdown")
+def stop_coordination():
+    coordinator.stop()
+    stream_manager.stop_all()
+    rgb_publisher.terminate()
+
 async def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)):
     print(f"Received Authorization header: {authorization}")
     if not authorization or not authorization.startswith("Bearer "):
@@ -229,15 +394,7 @@ async def register_plant(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    from datetime import datetime
-    last_watered_dt = None
-    if plant.last_watered:
-        try:
-            last_watered_dt = datetime.fromisoformat(plant.last_watered)
-        except Exception:
-            last_watered_dt = datetime.utcnow()
-    else:
-        last_watered_dt = datetime.utcnow()
+    last_watered_dt = parse_last_watered(plant.last_watered)
 
     new_plant = models.Plant(
         name=plant.name,
@@ -255,6 +412,70 @@ async def register_plant(
         plant=new_plant
     )
 
+@app.post("/plants/bulk", response_model=PlantBulkResponse)
+async def register_plants_bulk(
+    request: Request,
+    mode: str = Query("atomic", pattern="^(atomic|partial)$"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Body: JSON array, or NDJSON with Content-Type: application/x-ndjson
+    # mode=atomic: any invalid item rejects the whole batch
+    # mode=partial: valid items are registered, invalid ones are reported in `failed`
+    items, failed = await read_bulk_items(request)
+    if not items:
+        return PlantBulkResponse(success=False, message="No plants in request")
+    undecodable = {error.index for error in failed}
+
+    rows = []
+    row_indexes = []
+    for index, item in enumerate(items):
+        if index in undecodable:
+            continue  # NDJSON line that failed to decode, already reported
+        try:
+            plant = PlantCreate.model_validate(item)
+        except ValidationError as e:
+            failed.append(PlantBulkError(index=index, error=format_validation_error(e)))
+            continue
+        if len(plant.name) > 100 or len(plant.type) > 100:
+            failed.append(PlantBulkError(index=index, error="name and type must be at most 100 characters"))
+            continue
+        rows.append({
+            "name": plant.name,
+            "type": plant.type,
+            "watering_cycle": plant.watering_cycle,
+            "last_watered": parse_last_watered(plant.last_watered),
+            "owner_id": current_user.user_id,
+        })
+        row_indexes.append(index)
+
+    failed.sort(key=lambda error: error.index)
+    if failed and mode == "atomic":
+        return PlantBulkResponse(
+            success=False,
+            message=f"{len(failed)} of {len(items)} plants are invalid; nothing was registered",
+            failed=failed
+        )
+
+    def insert_and_commit():
+        ids = insert_plants_bulk(db, rows)
+        db.commit()
+        return ids
+
+    # Thousands of rows: keep the insert and commit off the event loop
+    try:
+        ids = await run_in_threadpool(insert_and_commit)
+    except SQLAlchemyError as e:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=500, detail=f"Bulk plant registration failed: {str(e)}")
+
+    return PlantBulkResponse(
+        success=bool(ids),
+        message=f"Registered {len(ids)} of {len(items)} plants",
+        created=[PlantBulkCreated(index=index, id=plant_id) for index, plant_id in zip(row_indexes, ids)],
+        failed=failed
+    )
+
 @app.post("/auth/refresh", response_model=LoginResponse)
 async def refresh_token(current_user: models.User = Depends(get_current_user)):
     access_token = create_access_token(data={"sub": current_user.user_id})
@@ -278,6 +499,58 @@ async def get_plants(
     plants = db.query(models.Plant).filter(models.Plant.owner_id == current_user.user_id).all()
     return plants
 
+@app.post("/cameras", response_model=CameraResponse)
+async def register_camera(
+    camera: CameraCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not 0 < camera.max_fps <= CAMERA_MAX_FPS_LIMIT:
+        return CameraResponse(success=False, message=f"max_fps must be positive and at most {CAMERA_MAX_FPS_LIMIT:g}")
+    if not 1 <= camera.max_concurrent <= CAMERA_MAX_CONCURRENT_LIMIT:
+        return CameraResponse(success=False, message=f"max_concurrent must be between 1 and {CAMERA_MAX_CONCURRENT_LIMIT}")
+    try:
+        await run_in_threadpool(validate_camera_url, camera.stream_url)
+    except CameraURLError as e:
+        return CameraResponse(success=False, message=str(e))
+    new_camera = models.Camera(
+        name=camera.name,
+        stream_url=camera.stream_url,
+        max_fps=camera.max_fps,
+        max_concurrent=camera.max_concurrent,
+        owner_id=current_user.user_id
+    )
+    db.add(new_camera)
+    db.commit()
+    db.refresh(new_camera)
+    return CameraResponse(success=True, message="Camera registered successfully", camera=new_camera)
+
+@app.get("/cameras", response_model=List[Camera])
+async def get_cameras(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return db.query(models.Camera).filter(models.Camera.owner_id == current_user.user_id).all()
+
+@app.put("/plants/{plant_id}/camera", response_model=PlantResponse)
+async def set_plant_camera(
+    plant_id: int,
+    link: PlantCameraLink,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    plant = db.query(models.Plant).filter(models.Plant.id == plant_id, models.Plant.owner_id == current_user.user_id).first()
+    if not plant:
+        raise HTTPException(status_code=404, detail="Plant not found")
+    if link.camera_id is not None:
+        camera = db.query(models.Camera).filter(models.Camera.id == link.camera_id, models.Camera.owner_id == current_user.user_id).first()
+        if not camera:
+            raise HTTPException(status_code=404, detail="Camera not found")
+    plant.camera_id = link.camera_id
+    db.commit()
+    db.refresh(plant)
+    return PlantResponse(success=True, message="Plant camera updated", plant=plant)
+
 @app.post("/plants/{plant_id}/led", response_model=PlantLedResponse)
 async def set_plant_led(
     plant_id: int,
@@ -311,7 +584,7 @@ async def set_plant_led(
     try:
         strength_ratio = led.strength / 255.0
         strength_ratio /= 2.0
-        rgb_publisher.publish_rgb(
+        publish_rgb(
             led.r * strength_ratio,
             led.g * strength_ratio,
             led.b * strength_ratio
@@ -351,78 +624,68 @@ async def get_plant_led(
     )
 
 @app.get("/plants/{plant_id}/ai-analysis")
-async def get_latest_plant_ai_analysis(
+def get_latest_plant_ai_analysis(
     plant_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # 1. MJPEG 스트림에서 프레임 추출
-    url = "https://planty.gaeun.xyz/image_raw"
-    try:
-        r = requests.get(url, stream=True, timeout=20)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to connect to image stream: {str(e)}")
-    bytes_data = b""
-    frame_found = False
-    img = None
-    for chunk in r.iter_content(chunk_size=1024):
-        bytes_data += chunk
-        a = bytes_data.find(b'\xff\xd8')  # JPEG 시작
-        b = bytes_data.find(b'\xff\xd9')  # JPEG 끝
-        if a != -1 and b != -1 and b > a:
-            jpg = bytes_data[a:b+2]
-            bytes_data = bytes_data[b+2:]
-            img_array = np.frombuffer(jpg, dtype=np.uint8)
-            frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            if frame is not None:
-                img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                frame_found = True
-                break
-    if not frame_found or img is None:
-        raise HTTPException(status_code=500, detail="프레임을 추출하지 못했습니다. 스트림이 정상인지 확인하세요.")
-
-    # 2. 이미지를 base64로 인코딩
-    buffer = io.BytesIO()
-    img.save(buffer, format="JPEG")
-    base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
-    base64_image_url = f"data:image/jpeg;base64,{base64_image}"
-
-    # 3. DB에서 plant_id로 식물 종류(type) 조회
+    # Sync route: runs in the threadpool so waiting on the camera and OpenAI
+    # does not block the event loop.
+    # 1. DB에서 plant_id로 식물 종류(type)와 카메라 조회
     plant = db.query(models.Plant).filter(models.Plant.id == plant_id, models.Plant.owner_id == current_user.user_id).first()
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
     plant_type = plant.type
 
-    # 4. OpenAI Vision API 호출
     openai_api_key = os.environ.get("OPENAI_API_KEY")
     if not openai_api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY 환경변수가 설정되어 있지 않습니다.")
-    client = OpenAI(api_key=openai_api_key)
-    prompt = f"이 식물({plant_type})의 건강 상태를 진단해줘. 병충해, 과습, 잎의 색 변화, 성장 상태 등을 고려해서 설명해줘."
+
+    camera = plant.camera
+    if camera is not None:
+        lease = stream_manager.lease(camera.id, camera.stream_url, camera.max_fps, camera.max_concurrent)
+    else:
+        lease = stream_manager.lease("default", CAMERA_STREAM_URL)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        { "type": "text", "text": prompt },
+        with lease as stream:
+            # 2. 공유 MJPEG 리더에서 최신 프레임을 가져와 base64로 인코딩
+            try:
+                jpg = stream.latest_jpeg()
+            except FrameUnavailableError as e:
+                raise HTTPException(status_code=500, detail=f"프레임을 추출하지 못했습니다. 스트림이 정상인지 확인하세요. ({str(e)})")
+            base64_image = base64.b64encode(jpg).decode("utf-8")
+            base64_image_url = f"data:image/jpeg;base64,{base64_image}"
+
+            # 3. OpenAI Vision API 호출
+            client = OpenAI(api_key=openai_api_key)
+            prompt = f"이 식물({plant_type})의 건강 상태를 진단해줘. 병충해, 과습, 잎의 색 변화, 성장 상태 등을 고려해서 설명해줘."
+            try:
+                response = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
                         {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": base64_image_url
-                            },
-                        },
+                            "role": "user",
+                            "content": [
+                                { "type": "text", "text": prompt },
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": base64_image_url
+                                    },
+                                },
+                            ],
+                        }
                     ],
-                }
-            ],
-            max_tokens=1024,
-        )
-        analysis_text = response.choices[0].message.content
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI Vision API 호출 실패: {str(e)}")
-
-    # 5. DB에 저장
+                    max_tokens=1024,
+                )
+                analysis_text = response.choices[0].message.content
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"OpenAI Vision API 호출 실패: {str(e)}")
+    except CameraBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    # 4. DB에 저장
     analysis = PlantAIAnalysis(plant_id=plant_id, analysis_text=analysis_text)
     db.add(analysis)
     db.commit()
@@ -445,4 +708,5 @@ async def get_plant(
 load_dotenv()
 
 if __name__ == "__main__":
+    # Development server; production runs gunicorn -c gunicorn.conf.py main:app
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, Float, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -13,6 +13,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     plants = relationship("Plant", back_populates="owner")
+    cameras = relationship("Camera", back_populates="owner")
 
 class Plant(Base):
     __tablename__ = "plants"
@@ -24,8 +25,24 @@ class Plant(Base):
     last_watered = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(String(50), ForeignKey("users.user_id"), nullable=False)
+    camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=True)  # None: default stream
     
     owner = relationship("User", back_populates="plants")
+    camera = relationship("Camera", back_populates="plants")
+
+class Camera(Base):
+    __tablename__ = "cameras"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    stream_url = Column(String(512), nullable=False)  # MJPEG stream
+    max_fps = Column(Float, nullable=False, default=2.0)  # frames decoded per second
+    max_concurrent = Column(Integer, nullable=False, default=4)  # concurrent analyses
+    created_at = Column(DateTime, default=datetime.utcnow)
+    owner_id = Column(String(50), ForeignKey("users.user_id"), nullable=False)
+
+    owner = relationship("User", back_populates="cameras")
+    plants = relationship("Plant", back_populates="camera")
 
 class PlantLed(Base):
     __tablename__ = "plant_leds"
@@ -1,22 +1,82 @@
 import roslibpy
 import time
+import os
+import threading
+
+ROS_HOST = os.getenv("ROS_HOST", "wireguard")
+ROS_PORT = int(os.getenv("ROS_PORT", "9090"))
+ROS_CONNECT_TIMEOUT = float(os.getenv("ROS_CONNECT_TIMEOUT", "3"))  # seconds per connection attempt
+ROS_RETRY_MAX_DELAY = 60  # seconds between attempts after repeated failures
 
 class RGBPublisher:
-    def __init__(self):
-        # Initialize ROS client with WebSocket connection
-        self.client = roslibpy.Ros(host='wireguard', port=9090)
-        self.client.run()
-        
-        # Create publisher for GPIO controller commands
-        self.publisher = roslibpy.Topic(
-            self.client,
-            '/gpio_controller/commands',
-            'control_msgs/DynamicInterfaceGroupValues'
-        )
-        
-        print('RGB Publisher has been started')
+    def __init__(self, host=ROS_HOST, port=ROS_PORT):
+        self.host = host
+        self.port = port
+        self.client = None
+        self.publisher = None
+        self.lock = threading.Lock()
+        self.retry_delay = 1.0
+        self.next_attempt = 0.0
+
+    def start(self):
+        # Connect only in the worker that owns ROS (see main.py). Raises if
+        # rosbridge is unreachable; the failed client is discarded.
+        with self.lock:
+            if self.client is not None:
+                return
+            # Initialize ROS client with WebSocket connection
+            client = roslibpy.Ros(host=self.host, port=self.port)
+            # Ros() schedules its connect from this thread; wake the reactor
+            # (already running after a failed attempt) so it is picked up
+            client.factory.manager.call_later(0, lambda: None)
+            try:
+                client.run(timeout=ROS_CONNECT_TIMEOUT)
+            except Exception:
+                self._discard(client)
+                raise
+            
+            # Create publisher for GPIO controller commands
+            self.publisher = roslibpy.Topic(
+                client,
+                '/gpio_controller/commands',
+                'control_msgs/DynamicInterfaceGroupValues'
+            )
+            self.client = client
+            
+            print('RGB Publisher has been started')
+
+    def ensure_started(self):
+        # Called periodically from the election thread, never on the request
+        # path; backs off exponentially while rosbridge is unreachable
+        if self.client is not None or time.monotonic() < self.next_attempt:
+            return
+        try:
+            self.start()
+            self.retry_delay = 1.0
+        except Exception as e:
+            print(f"Error starting RGB Publisher: {str(e)} (retrying in {self.retry_delay:.0f}s)")
+            self.next_attempt = time.monotonic() + self.retry_delay
+            self.retry_delay = min(self.retry_delay * 2, ROS_RETRY_MAX_DELAY)
+
+    def _discard(self, client):
+        # roslibpy's factory keeps reconnecting in the background after run()
+        # times out; stop it so a later attempt doesn't leave two connections
+        try:
+            client.close()
+        except Exception:
+            pass
+
+        def stop_factory():
+            client.factory.stopTrying()
+            if client.factory.connector is not None:
+                client.factory.connector.disconnect()
+
+        client.factory.manager.call_later(0, stop_factory)
 
     def publish_rgb(self, r: int, g: int, b: int):
+        client, publisher = self.client, self.publisher
+        if client is None or publisher is None or not client.is_connected:
+            raise Exception("RGB Publisher is not connected to ROS")
         # Create message structure
         msg = {
             'header': {
@@ -33,11 +93,23 @@ class RGBPublisher:
         }
         
         # Publish the message
-        self.publisher.publish(roslibpy.Message(msg))
+        publisher.publish(roslibpy.Message(msg))
         print(f'Publishing RGB values: [{r}, {g}, {b}]')
 
+    def stop(self):
+        # Close the connection but keep the reactor so start() can reconnect
+        with self.lock:
+            if self.client is not None:
+                self._discard(self.client)
+                self.client = None
+                self.publisher = None
+
     def terminate(self):
-        self.client.terminate()
+        with self.lock:
+            if self.client is not None:
+                self.client.terminate()
+                self.client = None
+                self.publisher = None
 
 # Create a singleton instance
 rgb_publisher = RGBPublisher()
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# main.py builds the engine and coordination backend at import time, so point
+# them at throwaway locations before any test imports it.
+_tmpdir = tempfile.mkdtemp(prefix="planty-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'planty.db')}")
+os.environ.setdefault("COORDINATION_DIR", os.path.join(_tmpdir, "coordination"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client():
+    """A TestClient logged in as a fresh user."""
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    user_id = f"test_{uuid.uuid4().hex[:8]}"
+    client.post("/auth/signup", json={
+        "nickname": "test", "userId": user_id, "userPw": "pw", "email": f"{user_id}@test.local",
+    })
+    token = client.post("/auth/login", json={"userId": user_id, "userPw": "pw"}).json()["token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import main
+
+PLANT = {"name": "monstera", "type": "monstera", "watering_cycle": 7}
+
+
+def plant_count(client):
+    return len(client.get("/plants").json())
+
+
+def post_ndjson(client, lines, mode="atomic"):
+    return client.post(
+        f"/plants/bulk?mode={mode}",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+
+def test_json_array_registers_all(client):
+    resp = client.post("/plants/bulk", json=[PLANT, {**PLANT, "name": "pothos"}]).json()
+    assert resp["success"]
+    assert [c["index"] for c in resp["created"]] == [0, 1]
+    assert resp["failed"] == []
+    assert plant_count(client) == 2
+
+
+def test_ids_without_ordered_returning(client, monkeypatch):
+    # Dialects without ordered RETURNING (e.g. MySQL) take the fallback path
+    monkeypatch.setattr(main.engine.dialect, "insert_executemany_returning_sort_by_parameter_order", False)
+    names = ["a", "b", "c"]
+    resp = client.post("/plants/bulk", json=[{**PLANT, "name": name} for name in names]).json()
+    assert resp["success"]
+    stored = {plant["id"]: plant["name"] for plant in client.get("/plants").json()}
+    assert [stored[c["id"]] for c in sorted(resp["created"], key=lambda c: c["index"])] == names
+
+
+def test_atomic_rejects_null_item(client):
+    resp = client.post("/plants/bulk", json=[None, PLANT]).json()
+    assert not resp["success"]
+    assert [f["index"] for f in resp["failed"]] == [0]
+    assert resp["created"] == []
+    assert plant_count(client) == 0
+
+
+def test_partial_reports_null_and_invalid_items(client):
+    resp = client.post("/plants/bulk?mode=partial", json=[None, PLANT, {"name": "x"}]).json()
+    assert resp["success"]
+    assert [c["index"] for c in resp["created"]] == [1]
+    assert [f["index"] for f in resp["failed"]] == [0, 2]
+    assert plant_count(client) == 1
+
+
+def test_json_body_must_be_array(client):
+    assert client.post("/plants/bulk", json=PLANT).status_code == 400
+    assert client.post("/plants/bulk", content=b"[{", headers={"Content-Type": "application/json"}).status_code == 400
+
+
+def test_ndjson_registers_all(client):
+    resp = post_ndjson(client, [json.dumps(PLANT), "", json.dumps(PLANT)]).json()
+    assert resp["success"]
+    assert [c["index"] for c in resp["created"]] == [0, 1]
+    assert plant_count(client) == 2
+
+
+def test_ndjson_atomic_rejects_bad_line_and_null(client):
+    resp = post_ndjson(client, [json.dumps(PLANT), "{not json", "null"]).json()
+    assert not resp["success"]
+    assert [f["index"] for f in resp["failed"]] == [1, 2]
+    assert plant_count(client) == 0
+
+
+def test_ndjson_partial_reports_bad_line_and_null(client):
+    resp = post_ndjson(client, ["null", "{not json", json.dumps(PLANT)], mode="partial").json()
+    assert resp["success"]
+    assert [c["index"] for c in resp["created"]] == [2]
+    assert [f["index"] for f in resp["failed"]] == [0, 1]
+    assert resp["failed"][1]["error"].startswith("Invalid JSON")
+    assert plant_count(client) == 1
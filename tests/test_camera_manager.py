@@ -0,0 +1,134 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+import camera_manager
+from coordination import LocalBackend
+from camera_manager import CameraBusyError, FrameUnavailableError, StreamManager
+
+FRAME = cv2.imencode(".jpg", np.zeros((48, 64, 3), dtype=np.uint8))[1].tobytes()
+
+
+class MjpegHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        try:
+            while True:
+                self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + FRAME + b"\r\n")
+                time.sleep(0.02)
+        except OSError:
+            return
+
+
+class EmptyRedirectHandler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        EmptyRedirectHandler.requests += 1
+        self.send_response(302)
+        self.send_header("Location", "/elsewhere")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture(autouse=True)
+def allow_localhost(monkeypatch):
+    monkeypatch.setattr(camera_manager, "CAMERA_ALLOWED_HOSTS", {"127.0.0.1"})
+
+
+@pytest.fixture
+def camera_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MjpegHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/image_raw"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager():
+    manager = StreamManager(idle_timeout=0.5)
+    yield manager
+    manager.stop_all()
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/image_raw"
+
+
+def test_shares_one_reader_per_camera(manager, camera_url):
+    with manager.lease("cam", camera_url) as first, manager.lease("cam", camera_url) as second:
+        assert first is second
+        assert first.latest_jpeg(timeout=5) == FRAME
+
+
+def test_concurrency_cap(manager, camera_url):
+    with manager.lease("cam", camera_url, max_concurrent=1):
+        with pytest.raises(CameraBusyError):
+            with manager.lease("cam", camera_url, max_concurrent=1):
+                pass
+
+
+def test_concurrency_cap_across_workers(tmp_path, camera_url):
+    owner, follower = StreamManager(idle_timeout=0.5), StreamManager(idle_timeout=0.5)
+    owner.serve_remote(LocalBackend(str(tmp_path)))
+    follower.use_remote(LocalBackend(str(tmp_path)))
+    try:
+        with owner.lease("cam", camera_url, max_concurrent=1):
+            with pytest.raises(CameraBusyError):
+                with follower.lease("cam", camera_url, max_concurrent=1):
+                    pass
+        with follower.lease("cam", camera_url, max_concurrent=1):
+            pass
+    finally:
+        owner.use_remote(LocalBackend(str(tmp_path)))
+        owner.stop_all()
+        follower.stop_all()
+
+
+def test_refused_connection_fails_fast(manager):
+    start = time.monotonic()
+    with manager.lease("cam", closed_port_url()) as stream:
+        with pytest.raises(FrameUnavailableError):
+            stream.latest_jpeg(timeout=15)
+    assert time.monotonic() - start < 5
+
+
+def test_empty_redirect_is_backed_off(manager):
+    EmptyRedirectHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmptyRedirectHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.monotonic()
+        with manager.lease("cam", f"http://127.0.0.1:{server.server_address[1]}/image_raw") as stream:
+            with pytest.raises(FrameUnavailableError):
+                stream.latest_jpeg(timeout=15)
+        assert time.monotonic() - start < 5
+        assert stream.stopped.wait(5)
+        assert EmptyRedirectHandler.requests <= 5
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_reader_stops_when_idle(manager, camera_url):
+    with manager.lease("cam", camera_url) as stream:
+        stream.latest_jpeg(timeout=5)
+    assert stream.stopped.wait(5)
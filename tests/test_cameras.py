@@ -0,0 +1,38 @@
+import pytest
+
+
+def register(client, url, **limits):
+    return client.post("/cameras", json={"name": "cam", "stream_url": url, **limits}).json()
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/image_raw",
+    "http://localhost/image_raw",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/stream",
+    "http://[::1]/stream",
+    "http://db:3306",
+    "ftp://8.8.8.8/stream",
+    "file:///etc/passwd",
+])
+def test_rejects_non_public_camera_urls(client, url):
+    resp = register(client, url)
+    assert not resp["success"]
+    assert client.get("/cameras").json() == []
+
+
+def test_accepts_public_camera_url(client):
+    resp = register(client, "http://8.8.8.8/image_raw")
+    assert resp["success"]
+    assert resp["camera"]["stream_url"] == "http://8.8.8.8/image_raw"
+
+
+@pytest.mark.parametrize("limits", [
+    {"max_fps": 0},
+    {"max_fps": 1000},
+    {"max_concurrent": 0},
+    {"max_concurrent": 10**9},
+])
+def test_rejects_out_of_range_limits(client, limits):
+    assert not register(client, "http://8.8.8.8/image_raw", **limits)["success"]
+    assert client.get("/cameras").json() == []
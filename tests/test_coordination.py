@@ -0,0 +1,66 @@
+import threading
+import time
+
+from coordination import Coordinator, LocalBackend
+
+
+class FlakyBackend:
+    def __init__(self):
+        self.reachable = True
+
+    def acquire_lock(self, name):
+        return self.reachable
+
+    def refresh_lock(self, name):
+        if not self.reachable:
+            raise ConnectionError("backend unreachable")
+        return True
+
+    def release_lock(self, name):
+        pass
+
+
+def test_refresh_error_demotes_owner():
+    backend = FlakyBackend()
+    events = []
+    coordinator = Coordinator(backend, interval=60)
+    coordinator.start(on_elected=lambda: events.append("elected"), on_demoted=lambda: events.append("demoted"))
+    assert coordinator.is_leader
+
+    backend.reachable = False
+    coordinator._step()
+    assert not coordinator.is_leader
+    assert events == ["elected", "demoted"]
+    coordinator.stop()
+
+
+def test_local_lock_has_single_owner_and_fails_over(tmp_path):
+    first = Coordinator(LocalBackend(str(tmp_path)), interval=60)
+    second = Coordinator(LocalBackend(str(tmp_path)), interval=60)
+    first.start()
+    second.start()
+    assert first.is_leader and not second.is_leader
+
+    first.stop()
+    second._step()
+    assert second.is_leader
+    second.stop()
+
+
+def test_while_leader_runs_on_election_thread(tmp_path):
+    called = threading.Event()
+    threads = []
+
+    def slow_connect():
+        threads.append(threading.current_thread().name)
+        time.sleep(1)
+        called.set()
+
+    coordinator = Coordinator(LocalBackend(str(tmp_path)), interval=60)
+    start = time.monotonic()
+    coordinator.start(while_leader=slow_connect)
+    assert coordinator.is_leader
+    assert time.monotonic() - start < 0.5
+    assert called.wait(5)
+    assert threads == ["election-owner"]
+    coordinator.stop()
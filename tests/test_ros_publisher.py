@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+import pytest
+
+import ros_publisher
+from ros_publisher import RGBPublisher
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fakes import FakeRosbridge, free_port  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def short_connect_timeout(monkeypatch):
+    monkeypatch.setattr(ros_publisher, "ROS_CONNECT_TIMEOUT", 1)
+
+
+def test_publish_without_connection_fails_immediately():
+    publisher = RGBPublisher(host="127.0.0.1", port=free_port())
+    start = time.monotonic()
+    with pytest.raises(Exception, match="not connected"):
+        publisher.publish_rgb(1, 2, 3)
+    assert time.monotonic() - start < 0.5
+
+
+def test_failed_attempts_back_off_and_do_not_leak_connections():
+    port = free_port()
+    publisher = RGBPublisher(host="127.0.0.1", port=port)
+    publisher.ensure_started()
+    assert publisher.client is None
+    assert publisher.next_attempt > time.monotonic()
+    publisher.ensure_started()  # still backing off: no new attempt
+    assert publisher.retry_delay == 2.0
+
+    ros = FakeRosbridge(port=port).start()
+    try:
+        time.sleep(3)  # a leaked client would have reconnected by now
+        assert ros.connections == 0
+
+        publisher.next_attempt = 0
+        publisher.ensure_started()
+        publisher.publish_rgb(1, 2, 3)
+        time.sleep(0.5)
+        assert ros.connections == 1
+        assert ros.published == 1
+    finally:
+        publisher.stop()
+        ros.stop()